@@ -6,11 +6,20 @@ import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext
 import threading
+import queue
 import time
 import socket
-from read_my_csv import extract_gps_from_csv
+from read_my_csv import read_header, iter_gps_rows
 import random
 import string
+
+# Character set for generated aircraft IDs (uppercase letters, lowercase letters, and digits)
+_ALPHABET = string.ascii_letters + string.digits
+
+# Seconds of replay time between XAIRCRAFT resends, so a receiver started
+# mid-replay (or a lost datagram) still gets the aircraft metadata
+AIRCRAFT_INFO_INTERVAL = 1.0
+
 class GPSDataSenderApp:
     def __init__(self, root):
         self.root = root
@@ -22,7 +31,7 @@ class GPSDataSenderApp:
         self.file_path = tk.StringVar()
         self.mode = tk.StringVar(value="traffic")
         self.status = tk.StringVar(value="Ready")
-        self.sending_active = False
+        self.stop_requested = threading.Event()  # Set by Stop, wakes the sending thread from its pacing wait
         self.send_thread = None
         
         # Aircraft metadata variables
@@ -34,13 +43,28 @@ class GPSDataSenderApp:
         self.flight_number = tk.StringVar(value="")
         self.aircraft_id = tk.StringVar(value=self.generate_random_id())
         self.send_aircraft_info = tk.BooleanVar(value=True)
+        self.log_packets = tk.BooleanVar(value=False)  # Log every sent packet, the status line shows progress otherwise
 
         # UDP settings
         self.udp_ip = tk.StringVar(value="127.0.0.1")
         self.udp_port = tk.IntVar(value=49002)
         
+        # Log lines and status updates queued by any thread, flushed by the Tk thread
+        self.log_queue = queue.Queue()
+        self.status_queue = queue.Queue()  # Line count while sending, or a final status string
+        
+        # One UDP socket for the lifetime of the app, connected to the target by each replay.
+        # Non-blocking, realtime replay drops a packet rather than stall on a full buffer
+        self._udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._udp_sock.setblocking(False)
+        # Custom messages use their own unconnected socket, so they never
+        # retarget a running replay or pick up its pending ICMP errors
+        self._custom_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        
         # Create UI
         self.create_widgets()
+        self.root.after(100, self._drain_queues)
+        self.root.protocol("WM_DELETE_WINDOW", self.close_application)
         
     def create_widgets(self):
         # Main frame with padding
@@ -125,6 +149,8 @@ class GPSDataSenderApp:
         self.stop_button = ttk.Button(button_frame, text="Stop", command=self.stop_sending, state=tk.DISABLED)
         self.stop_button.pack(side=tk.LEFT, padx=5)
         
+        ttk.Checkbutton(button_frame, text="Log every packet", variable=self.log_packets).pack(side=tk.LEFT, padx=20)
+        
         # Log and status section
         status_frame = ttk.LabelFrame(main_frame, text="Status and Log", padding="5")
         status_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -145,9 +171,31 @@ class GPSDataSenderApp:
             self.log(f"Selected file: {filename}")
     
     def log(self, message):
+        """Queue a log line; safe to call from the sending thread."""
         timestamp = time.strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.log_text.see(tk.END)  # Auto-scroll to bottom
+        self.log_queue.put(f"[{timestamp}] {message}\n")
+        
+    def _drain_queues(self):
+        """Flush queued log lines with a single insert and show the latest status, then reschedule."""
+        items = []
+        while True:
+            try:
+                items.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if items:
+            self.log_text.insert(tk.END, "".join(items))
+            self.log_text.see(tk.END)  # Auto-scroll to bottom
+        
+        latest = None
+        while True:
+            try:
+                latest = self.status_queue.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            self.status.set(latest if isinstance(latest, str) else f"Sending: line {latest}")
+        self.root.after(100, self._drain_queues)
         
     def start_sending(self):
         if not self.file_path.get():
@@ -163,14 +211,14 @@ class GPSDataSenderApp:
         self.stop_button.config(state=tk.NORMAL)
         
         # Start sending in a separate thread
-        self.sending_active = True
+        self.stop_requested.clear()
         self.send_thread = threading.Thread(target=self.send_data_thread)
         self.send_thread.daemon = True
         self.send_thread.start()
         
     def stop_sending(self):
-        self.sending_active = False
-        self.status.set("Stopped")
+        self.stop_requested.set()
+        self.status_queue.put("Stopped")  # Queued so it lands after any pending line count
         self.log("Sending stopped by user")
         self.start_button.config(state=tk.NORMAL)
         self.stop_button.config(state=tk.DISABLED)
@@ -182,9 +230,7 @@ class GPSDataSenderApp:
             return
             
         try:
-            # Create UDP socket and send message
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            sock.sendto(bytes(message, "utf-8"), (self.udp_ip.get(), self.udp_port.get()))
+            self._custom_sock.sendto(bytes(message, "utf-8"), (self.udp_ip.get(), int(self.udp_port.get())))
             self.log(f"Custom message sent: {message}")
         except Exception as e:
             self.log(f"Error sending custom message: {str(e)}")
@@ -199,92 +245,120 @@ class GPSDataSenderApp:
         Returns:
             A random alphanumeric string
         """
-        # Define the character set (uppercase letters, lowercase letters, and digits)
-        characters = string.ascii_letters + string.digits
-        
-        # Generate the random string
-        random_id = ''.join(random.choice(characters) for _ in range(16))
-        
-        return random_id
+        return ''.join(random.choices(_ALPHABET, k=16))
 
     def send_data_thread(self):
         """Thread function for sending GPS data"""
         self.log(f"Starting to send data from {self.file_path.get()} in {self.mode.get()} mode")
-        self.status.set("Sending...")
+        self.status_queue.put("Sending...")
         
         try:
-            # Extract data from CSV
-            gps_att_time_data, file_icao, file_callsign = extract_gps_from_csv(self.file_path.get())
+            # Read identification from the CSV header; rows are streamed below
+            file_icao, file_callsign = read_header(self.file_path.get())
             
             # Use metadata from file if not specified in GUI
             icao_address = self.icao_address.get() if self.icao_address.get() else file_icao
             callsign = self.callsign.get() if self.callsign.get() else file_callsign
             
-            # Create UDP socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            # Resolve the Tk variables once, they can't change while sending
+            addr = (self.udp_ip.get(), int(self.udp_port.get()))
+            is_traffic = self.mode.get().lower() == "traffic"
+            send_aircraft_info = self.send_aircraft_info.get()
+            log_packets = self.log_packets.get()
+            
+            # Point the shared socket at the target, so each packet is a plain send()
+            sock = self._udp_sock
+            sock.connect(addr)
+            # Discard a port-unreachable error left pending by a previous run
+            sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
             airborne_flag = 1
             simulator_name = self.simulator_name.get()
             
-            self.log(f"UDP target: {self.udp_ip.get()}:{self.udp_port.get()}")
+            self.log(f"UDP target: {addr[0]}:{addr[1]}")
             self.log(f"ICAO Address: {icao_address}, Callsign: {callsign}")
             
-            # Prepare aircraft info message
-            aircraft_info = (
-                f"XAIRCRAFT{simulator_name},{self.aircraft_id.get()},{icao_address},{self.aircraft_type.get()},"
-                f"{self.registration.get()},{callsign},{self.flight_number.get()}"
-            )
+            # Send aircraft data message if enabled, it is constant for the whole run
+            # and resent every AIRCRAFT_INFO_INTERVAL from the sending loop
+            aircraft_packet = None
+            if send_aircraft_info:
+                aircraft_info = (
+                    f"XAIRCRAFT{simulator_name},{self.aircraft_id.get()},{icao_address},{self.aircraft_type.get()},"
+                    f"{self.registration.get()},{callsign},{self.flight_number.get()}"
+                )
+                aircraft_packet = aircraft_info.encode()
+                try:
+                    sock.send(aircraft_packet)
+                    self.log(f"Sent aircraft info: {aircraft_info}")
+                except (BlockingIOError, ConnectionRefusedError) as e:
+                    self.log(f"Aircraft info not sent: {e}")
             
-            # Send aircraft data message if enabled
-            if self.send_aircraft_info.get():
-                sock.sendto(bytes(aircraft_info, "utf-8"), (self.udp_ip.get(), self.udp_port.get()))
-                self.log(f"Sent aircraft info: {aircraft_info}")
+            # Constant parts of each packet, encoded once; rows are %-formatted straight into bytes
+            traffic_prefix = f"XTRAFFIC{simulator_name},{icao_address},".encode()
+            traffic_suffix = f",{callsign}".encode()
+            gps_prefix = f"XGPS{simulator_name},".encode()
+            att_prefix = f"XATT{simulator_name},".encode()
             
-            # Main sending loop
+            # Main sending loop, each row is sent at an absolute offset from the start
+            # so sleep jitter does not accumulate over long recordings
             line_count = 0
-            for i in gps_att_time_data:
-                if not self.sending_active:
+            elapsed = 0.0
+            next_aircraft_info = AIRCRAFT_INFO_INTERVAL  # Replay time of the next XAIRCRAFT resend
+            start = time.monotonic()
+            for i in iter_gps_rows(self.file_path.get()):
+                # Wait for this data point's deadline, waking up early if stopped
+                elapsed += i[8]
+                if self.stop_requested.wait(max(0.0, start + elapsed - time.monotonic())):
                     break
                     
                 # Update UI from thread
-                self.root.after(0, lambda count=line_count: self.status.set(f"Sending: line {count}"))
+                self.status_queue.put(line_count)
                 
-                if self.mode.get().lower() == "traffic":
-                    # XTRAFFIC<simulator_name>,<icao_address>,<latitude>,<longitude>,<altitude_ft>,<vertical_speed_ft/min>,<airborne_flag>,<heading_true>,<velocity_knots>,<callsign>
-                    message = f"XTRAFFIC{simulator_name},{icao_address},{i[1]},{i[0]},{i[2]},0.0,{airborne_flag},{i[5]},{i[4]},{callsign}"
-                    sock.sendto(bytes(message, "utf-8"), (self.udp_ip.get(), self.udp_port.get()))
-                else:  # GPS mode
-                    # XGPS<simulator_name>,<longitude>,<latitude>,<altitude_msl>,<track_true_north>,<groundspeed_m/s>
-                    message = f"XGPS{simulator_name},{i[0]},{i[1]},{i[2]},{i[3]},{i[4]}"
-                    message2 = f"XATT{simulator_name},{i[5]},{i[6]},{i[7]}"
-                    
-                    # Only send aircraft info if enabled
-                    if self.send_aircraft_info.get():
-                        sock.sendto(bytes(aircraft_info, "utf-8"), (self.udp_ip.get(), self.udp_port.get()))
-                    sock.sendto(bytes(message, "utf-8"), (self.udp_ip.get(), self.udp_port.get()))
-                    sock.sendto(bytes(message2, "utf-8"), (self.udp_ip.get(), self.udp_port.get()))
+                if aircraft_packet is not None and elapsed >= next_aircraft_info:
+                    next_aircraft_info = elapsed + AIRCRAFT_INFO_INTERVAL
+                    try:
+                        sock.send(aircraft_packet)
+                    except (BlockingIOError, ConnectionRefusedError):
+                        pass  # Retried at the next interval
                 
-                line_count += 1
-                self.root.after(0, lambda msg=f"Line {line_count}: {message}": self.log(msg))
-                if self.send_aircraft_info.get():
-                    self.root.after(0, lambda msg=f"Line {line_count}: {aircraft_info}": self.log(msg))
+                try:
+                    if is_traffic:
+                        # XTRAFFIC<simulator_name>,<icao_address>,<latitude>,<longitude>,<altitude_ft>,<vertical_speed_ft/min>,<airborne_flag>,<heading_true>,<velocity_knots>,<callsign>
+                        message = b"%s%.6f,%.6f,%.2f,0.0,%d,%.2f,%.2f%s" % (traffic_prefix, i[1], i[0], i[2], airborne_flag, i[5], i[4], traffic_suffix)
+                        sock.send(message)
+                    else:  # GPS mode
+                        # XGPS<simulator_name>,<longitude>,<latitude>,<altitude_msl>,<track_true_north>,<groundspeed_m/s>
+                        message = b"%s%.6f,%.6f,%.2f,%.2f,%.2f" % (gps_prefix, i[0], i[1], i[2], i[3], i[4])
+                        message2 = b"%s%.2f,%.2f,%.2f" % (att_prefix, i[5], i[6], i[7])
+                        sock.send(message)
+                        sock.send(message2)
+                except BlockingIOError:
+                    pass  # Send buffer full, this data point is dropped
+                except ConnectionRefusedError:
+                    pass  # Nothing is listening yet, keep replaying on schedule
                 
-                # Wait for the next data point
-                time.sleep(float(i[8]))
+                line_count += 1
+                if log_packets:
+                    self.log(f"Line {line_count}: {message.decode()}")
                 
             # Finalize
-            if self.sending_active:  # Only if not stopped by user
-                self.root.after(0, lambda: self.log(f"Finished sending all {line_count} data points"))
-                self.root.after(0, lambda: self.status.set("Completed"))
+            if not self.stop_requested.is_set():  # Only if not stopped by user
+                self.log(f"Finished sending all {line_count} data points")
+                self.status_queue.put("Completed")
             
         except Exception as e:
-            error_msg = f"Error: {str(e)}"
-            self.root.after(0, lambda msg=error_msg: self.log(msg))
-            self.root.after(0, lambda: self.status.set("Error"))
+            self.log(f"Error: {str(e)}")
+            self.status_queue.put("Error")
         finally:
             # Re-enable start button, disable stop button
             self.root.after(0, lambda: self.start_button.config(state=tk.NORMAL))
             self.root.after(0, lambda: self.stop_button.config(state=tk.DISABLED))
-            self.sending_active = False
+
+    def close_application(self):
+        """Stop any running replay, release the UDP sockets and close the window."""
+        self.stop_requested.set()
+        self._udp_sock.close()
+        self._custom_sock.close()
+        self.root.destroy()
 
 def main():
     root = tk.Tk()
@@ -1,17 +1,19 @@
+import selectors
 import socket
 import threading
-import re
 import tkinter as tk
 from tkintermapview import TkinterMapView
 from tkinter import font as tkfont
 from tkinter import filedialog
 from PIL import Image, ImageTk
-from typing import Optional, Dict, Any, Tuple, List
+from typing import Optional, Dict, Any, Tuple, List, Callable
 from dataclasses import dataclass
 import time
 import csv
 import xml.etree.ElementTree as ET
 import os
+import queue
+from collections import OrderedDict
 
 # Constants
 UDP_PORT = 49002
@@ -19,11 +21,65 @@ WINDOW_SIZE = "1000x800"
 MAP_SIZE = (800, 600)
 CONTROL_FRAME_WIDTH = 200
 INFO_DISPLAY_SIZE = (24, 9)
-UPDATE_INTERVAL = 1000  # milliseconds
-RECEIVE_TIMEOUT = 5.0  # seconds
+WATCHDOG_INTERVAL = 2000  # milliseconds, refresh the display even when no data arrives
+REFRESH_INTERVAL = 0.1  # seconds, caps data-driven display refreshes at ~10 Hz
+TRAFFIC_HEADING_STEP = 5  # degrees per traffic icon rotation (72 icons)
+RECEIVE_TIMEOUT_NS = 5_000_000_000  # 5 seconds
+TRAFFIC_TIMEOUT_NS = 30_000_000_000  # 30 seconds
+CSV_BUFFER_SIZE = 1 << 20  # 1 MiB, lets small row writes coalesce into few write() calls
+SOCKET_RCVBUF_SIZE = 4 * 1024 * 1024  # kernel receive queue, absorbs bursts while the GUI is busy
+RECV_BUFFER_SIZE = 1500  # one Ethernet MTU, messages are well under 200 bytes
+RECORDER_FILE = "output_recorder/output_GPS_DATA.csv"
+RECORDER_FLUSH_ROWS = 256  # flush the recorder file after N buffered rows...
+RECORDER_FLUSH_INTERVAL = 2.0  # ...or after this many seconds, whichever comes first
+RECORD_INTERVAL_NS = 1_000_000_000  # at most one recorder row per second
+RECORDER_BATCH_SIZE = 64  # rows the writer thread takes off the queue at once
 
+# Full prefixes of the messages the receiver understands
+KNOWN_MESSAGE_PREFIXES = (b'XGPS', b'XATT', b'XAIRCRAFT', b'XTRAFFIC')
 
-@dataclass
+# Length of the message type prefix that precedes the simulator name, keyed by
+# the first 4 characters (only standard ForeFlight messages carry the name)
+SIMULATOR_NAME_OFFSETS = {b'XGPS': 4, b'XATT': 4, b'XTRA': 8}
+
+# Header row of each timestamped CSV file, keyed by file kind
+CSV_HEADERS = {
+    'gps': ['Timestamp', 'Latitude', 'Longitude', 'Altitude', 'Track', 'Ground_Speed'],
+    'attitude': ['Timestamp', 'True_Heading', 'Pitch', 'Roll'],
+    'traffic': ['Timestamp', 'ICAO', 'Latitude', 'Longitude', 'Altitude_ft', 'VS_ft_min', 'Airborne', 'Heading', 'Velocity_kts', 'Callsign'],
+}
+
+# XGPS values (longitude, latitude, altitude, track, ground speed) that
+# Aerofly FS sends while in the menu, not a real position
+GPS_MENU_STATE = (0.0, 0.0, 0.0, 90.0, 0.0)
+
+# Replay recorder rows, byte-identical to what csv.writer produces for
+# [gps, attitude, timestamp]: the dataclass reprs contain commas (so are
+# quoted) but never quotes, and a missing attitude is an empty field
+RECORDER_ROW = '"%r","%r",%r\r\n'
+RECORDER_ROW_NO_ATTITUDE = '"%r",,%r\r\n'
+
+# Recorder queue item that closes the current replay recorder file
+_RECORDER_CLOSE = object()
+
+# Map choices offered in the listbox, as (name, tile server URL)
+MAP_OPTIONS = (
+    ("OpenStreetMap", "https://a.tile.openstreetmap.org/{z}/{x}/{y}.png"),
+    ("OpenStreetMap DE", "https://tile.openstreetmap.de/tiles/osmde/{z}/{x}/{y}.png"),
+    ("OpenStreetMap FR", "https://a.tile.openstreetmap.fr/osmfr/{z}/{x}/{y}.png"),
+    ("OpenTopoMap", "https://a.tile.opentopomap.org/{z}/{x}/{y}.png"),
+    ("Google Normal", "https://mt0.google.com/vt/lyrs=m&hl=en&x={x}&y={y}&z={z}"),
+    ("Google Satellite", "https://mt0.google.com/vt/lyrs=s&hl=en&x={x}&y={y}&z={z}"),
+    ("Google Terrain", "https://mt0.google.com/vt/lyrs=p&hl=en&x={x}&y={y}&z={z}"),
+    ("Google Hybrid", "https://mt0.google.com/vt/lyrs=y&hl=en&x={x}&y={y}&z={z}"),
+    ("Carto Dark Matter", "https://cartodb-basemaps-a.global.ssl.fastly.net/dark_all/{z}/{x}/{y}.png"),
+    ("Carto Positron", "https://cartodb-basemaps-a.global.ssl.fastly.net/light_all/{z}/{x}/{y}.png"),
+    ("ESRI World Imagery", "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}"),
+    ("ESRI World Street Map", "https://server.arcgisonline.com/ArcGIS/rest/services/World_Street_Map/MapServer/tile/{z}/{y}/{x}"),
+    ("ESRI World Topo Map", "https://server.arcgisonline.com/ArcGIS/rest/services/World_Topo_Map/MapServer/tile/{z}/{y}/{x}"),
+)
+
+@dataclass(slots=True)
 class GPSData:
     """Dataclass to store GPS data received from the flight simulator."""
     longitude: float
@@ -32,13 +88,13 @@ class GPSData:
     track: float
     ground_speed: float
 
-@dataclass
+@dataclass(slots=True)
 class AttitudeData:
     """Dataclass to store attitude data received from the flight simulator."""
     true_heading: float
     pitch: float
     roll: float
-@dataclass    
+@dataclass(slots=True)
 class AircraftData:
     """Dataclass to store airplane data received from the network."""
 
@@ -49,7 +105,7 @@ class AircraftData:
     icao24: str # International Civil Aviation Organization's unique four-character identifier for this aircraft
     FlightNumber: str
 
-@dataclass
+@dataclass(slots=True)
 class AirTrafficData:
     """Dataclass to store traffic data received from the network."""
     icao_address: str
@@ -71,170 +127,255 @@ class UDPReceiver:
     def __init__(self, port: int = UDP_PORT):
         self.port = port
         self.socket: Optional[socket.socket] = None
-        self.latest_gps_data: Optional[GPSData] = None
-        self.latest_attitude_data: Optional[AttitudeData] = None
-        self.latest_aircraft_data: Optional[AircraftData] = None
-        self.traffic_data: Dict[str, Tuple[AirTrafficData, float]] = {}  # Store traffic data with timestamp
+        self._selector: Optional[selectors.BaseSelector] = None
+        # stop() writes to _wakeup_send so the receive thread leaves select()
+        self._wakeup_recv: Optional[socket.socket] = None
+        self._wakeup_send: Optional[socket.socket] = None
+        # Newest XGPS/XATT/XAIRCRAFT datagram per tag, only parsed when read
+        # through the latest_* properties, and the (datagram, result) of the last parse
+        self._raw_messages: Dict[bytes, bytes] = {}
+        self._parsed_messages: Dict[bytes, Tuple[Optional[bytes], Any]] = {}
+        # Traffic data with timestamp, ordered from least to most recently updated
+        self.traffic_data: OrderedDict[str, Tuple[AirTrafficData, int]] = OrderedDict()
+        # Guards traffic_data: the receive thread reorders it while the Tk thread
+        # expires and copies it, and OrderedDict iteration fails on any reorder
+        self._traffic_lock = threading.Lock()
         self.running: bool = False
         self.receive_thread: Optional[threading.Thread] = None
-        self.last_receive_time: float = 0
+        self.last_receive_time: int = 0  # time.monotonic_ns() of the last message
         self.log_to_csv: bool = False
         self.armed_for_recording: bool = False
         self.csv_files = {}
+        # Replay recorder rows are queued by the receive thread and written by
+        # a dedicated writer thread, so slow disks never stall reception or the GUI.
+        # Items are rows, _RECORDER_CLOSE to close the file, or None to exit.
+        self._recorder_queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._recorder_thread: Optional[threading.Thread] = None
+        self._last_record_time: int = 0
         self.simulator_name: str = "Unknown"
         self.simulator_name_set: bool = False
-
+        # Called from the receive thread after a batch of datagrams was processed
+        self.on_data: Optional[Callable[[], None]] = None
+        # Message handlers keyed by the first 4 characters of the message
+        self._handlers = {
+            b'XGPS': self._store_raw_message,
+            b'XATT': self._store_raw_message,
+            b'XAIR': self._store_raw_message,
+            b'XTRA': self._handle_traffic_data,
+        }
 
     def start_receiving(self) -> None:
         """Initialize and start the UDP receiving thread."""
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        self.socket.settimeout(0.5)  # Set a timeout for the socket
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF_SIZE)
+        # The OS may cap (or on Linux, double) the requested size
+        print(f"UDP receive buffer: {self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)} bytes")
+        self.socket.setblocking(False)
         self.socket.bind(('', self.port))
+        # The thread sleeps in select() until a datagram arrives or stop()
+        # wakes it up, instead of waking up on a socket timeout
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.socket, selectors.EVENT_READ)
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ)
         self.running = True
         self.receive_thread = threading.Thread(target=self._receive_data)
         self.receive_thread.start()
+        self._recorder_thread = threading.Thread(target=self._recorder_loop, daemon=True)
+        self._recorder_thread.start()
 
     def _receive_data(self) -> None:
         """Continuously receive and parse UDP data while the thread is running."""
         while self.running:
-            try:
-                data, _ = self.socket.recvfrom(1024)
-                self.last_receive_time = time.time()
-                message = data.decode('utf-8')
-                
-                # Extract simulator name only from standard ForeFlight UDP messages
-                if not self.simulator_name_set and ',' in message:
-                    # Check for standard ForeFlight message types
-                    if message.startswith(('XGPS', 'XATT', 'XTRAFFIC')):
-                        parts = message.split(',', 1)
-                        if len(parts) > 1:
-                            msg_type = parts[0]
-                            # Extract simulator name after the standard prefix
-                            if msg_type.startswith('XGPS'):
-                                self.simulator_name = msg_type[4:]
-                            elif msg_type.startswith('XATT'):
-                                self.simulator_name = msg_type[4:]
-                            elif msg_type.startswith('XTRAFFIC'):
-                                self.simulator_name = msg_type[8:]
-                            
-                            if self.simulator_name:  # Only set if we found a name
-                                self.simulator_name_set = True
-                                print(f"Detected simulator: {self.simulator_name}")
-                
-                if message.startswith('XGPS'):
-                    self.latest_gps_data = self._parse_gps_data(message)
-                if message.startswith('XATT'):
-                    self.latest_attitude_data = self._parse_attitude_data(message)
-                if message.startswith('XAIRCRAFT'):
-                    self.latest_aircraft_data = self._parse_aircraft_data(message)
-                if message.startswith('XTRAFFIC'):
-                    traffic_data = self._parse_traffic_data(message)
-                    if traffic_data:
-                        # Store with current timestamp
-                        self.traffic_data[traffic_data.icao_address] = (traffic_data, time.time())
-                        
-                # Check if we need to start logging after arming
-                if self.armed_for_recording and (self.latest_gps_data or len(self.traffic_data) > 0):
-                    self.armed_for_recording = False
-                    self.log_to_csv = True
-                    print("Recording automatically started after arming")
-                    # Initialize CSV files
-                    timestamp = time.strftime("%Y%m%d-%H%M%S")
-                    self.csv_files = {
-                        'gps': open(f"output_GPS_DATA_{timestamp}.csv", "w", newline=''),
-                        'attitude': open(f"output_ATTITUDE_DATA_{timestamp}.csv", "w", newline=''),
-                        'traffic': open(f"output_TRAFFIC_DATA_{timestamp}.csv", "w", newline='')
-                    }
-                    # Write headers
-                    csv.writer(self.csv_files['gps']).writerow(['Timestamp', 'Latitude', 'Longitude', 'Altitude', 'Track', 'Ground_Speed'])
-                    csv.writer(self.csv_files['attitude']).writerow(['Timestamp', 'True_Heading', 'Pitch', 'Roll'])
-                    csv.writer(self.csv_files['traffic']).writerow(['Timestamp', 'ICAO', 'Latitude', 'Longitude', 'Altitude_ft', 'VS_ft_min', 'Airborne', 'Heading', 'Velocity_kts', 'Callsign'])
-            except socket.timeout:
-                # This is expected, just continue the loop
-                pass
-            except Exception as e:
-                print(f"Error receiving data: {e}")
+            self._selector.select(timeout=None)
+            if not self.running:
+                break
+            # Drain every datagram queued since the last wakeup, all
+            # stamped with the same clock read
+            now = time.monotonic_ns()
+            received = False
+            while self.running:
+                try:
+                    data = self.socket.recv(RECV_BUFFER_SIZE)
+                except BlockingIOError:
+                    break
+                except Exception as e:
+                    print(f"Error receiving data: {e}")
+                    break
+                received = True
+                try:
+                    self._process_datagram(data, now)
+                except Exception as e:
+                    print(f"Error receiving data: {e}")
+            on_data = self.on_data
+            if received and on_data:
+                on_data()
+
+    def _process_datagram(self, data: bytes, now: int) -> None:
+        """Dispatch one datagram to its handler and start armed recording."""
+        # Drop unknown packets with a single C-level multi-prefix match
+        if not data.startswith(KNOWN_MESSAGE_PREFIXES):
+            return
+        # Handlers reuse this as the receive timestamp
+        self.last_receive_time = now
+        # Messages are parsed straight from the datagram bytes,
+        # only text fields get decoded
+        tag = data[:4]
+        
+        # Extract simulator name only from standard ForeFlight UDP messages
+        if not self.simulator_name_set and tag in SIMULATOR_NAME_OFFSETS:
+            end = data.find(b',')
+            if end > 0:
+                # Extract simulator name after the standard prefix
+                name = data[SIMULATOR_NAME_OFFSETS[tag]:end].decode('utf-8')
+                if name:  # Only set if we found a name
+                    self.simulator_name = name
+                    self.simulator_name_set = True
+                    print(f"Detected simulator: {self.simulator_name}")
+        
+        self._handlers[tag](data)
+        
+        # Queue a replay recorder row, at most one per RECORD_INTERVAL_NS
+        if (self.log_to_csv
+                and self.last_receive_time - self._last_record_time >= RECORD_INTERVAL_NS
+                and self.latest_gps_data):
+            self._last_record_time = self.last_receive_time
+            self._recorder_queue.put((self.latest_gps_data, self.latest_attitude_data, time.time()))
+        
+        # Check if we need to start logging after arming
+        if self.armed_for_recording and (self.latest_gps_data or len(self.traffic_data) > 0):
+            self.armed_for_recording = False
+            self.log_to_csv = True
+            print("Recording automatically started after arming")
+            self._open_csv_files()
+
+    def _store_raw_message(self, message: bytes) -> None:
+        # Parsing is deferred until someone reads the data, the display
+        # refreshes far less often than the simulator sends
+        self._raw_messages[message[:4]] = message
+
+    def _latest(self, tag: bytes, parse: Callable[[bytes], Any]) -> Any:
+        """Return the parsed newest datagram for tag, parsing it at most once."""
+        raw = self._raw_messages.get(tag)
+        cached = self._parsed_messages.get(tag)
+        if cached is None or cached[0] is not raw:
+            # Stored as one tuple so concurrent readers never see a mismatched pair
+            cached = (raw, parse(raw) if raw is not None else None)
+            self._parsed_messages[tag] = cached
+        return cached[1]
+
+    @property
+    def latest_gps_data(self) -> Optional[GPSData]:
+        return self._latest(b'XGPS', self._parse_gps_data)
+
+    @property
+    def latest_attitude_data(self) -> Optional[AttitudeData]:
+        return self._latest(b'XATT', self._parse_attitude_data)
+
+    @property
+    def latest_aircraft_data(self) -> Optional[AircraftData]:
+        return self._latest(b'XAIR', self._parse_aircraft_data)
+
+    def _handle_traffic_data(self, message: bytes) -> None:
+        traffic_data = self._parse_traffic_data(message)
+        if traffic_data:
+            # Store with current timestamp
+            with self._traffic_lock:
+                self.traffic_data[traffic_data.icao_address] = (traffic_data, self.last_receive_time)
+                self.traffic_data.move_to_end(traffic_data.icao_address)
+
     @staticmethod
-    def _parse_gps_data(message: str) -> Optional[GPSData]:
+    def _parse_gps_data(message: bytes) -> Optional[GPSData]:
         """Parse GPS data from the received message."""
-        # Match XGPS followed by optional simulator name and data
-        pattern = r'XGPS(?:[^,]+)?,([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+)'
-        match = re.match(pattern, message)
-        if match:
-            latitude, longitude, altitude, track, ground_speed = map(float, match.groups())
+        # XGPS<simulator_name>,<longitude>,<latitude>,<altitude_msl>,<track_true_north>,<groundspeed_m/s>
+        parts = message.split(b',', 6)
+        if len(parts) < 6:
+            return None
+        try:
+            values = tuple(map(float, parts[1:6]))
+        except ValueError:
+            return None
             
-            # Check for the specific "menu state" condition
-            if (latitude == 0.0 and longitude == 0.0 and 
-                altitude == 0.0 and track == 90.0 and ground_speed == 0.0):
-                # This is the menu state - return None instead
-                return None
-                
-            # Otherwise return the valid GPS data
-            return GPSData(*map(float, match.groups()))
-        
-        return None
+        # Check for the specific "menu state" condition
+        if values == GPS_MENU_STATE:
+            # This is the menu state - return None instead
+            return None
+            
+        # Otherwise return the valid GPS data
+        return GPSData(*values)
     @staticmethod
-    def _parse_attitude_data(message: str) -> Optional[AttitudeData]:
+    def _parse_attitude_data(message: bytes) -> Optional[AttitudeData]:
         """Parse attitude data from the received message."""
-        pattern = r'XATT(?:[^,]+)?,([-\d.]+),([-\d.]+),([-\d.]+)'
-        match = re.match(pattern, message)
-        if match:
-            return AttitudeData(*map(float, match.groups()))
-        return None
+        # XATT<simulator_name>,<true_heading>,<pitch>,<roll>
+        parts = message.split(b',', 4)
+        if len(parts) < 4:
+            return None
+        try:
+            return AttitudeData(*map(float, parts[1:4]))
+        except ValueError:
+            return None
     @staticmethod
-    def _parse_aircraft_data(message: str) -> Optional[AircraftData]:
+    def _parse_aircraft_data(message: bytes) -> Optional[AircraftData]:
         """Parse Aircraft data from the received message."""
-        pattern = r'^XAIRCRAFT(?:[^,]+)?,([A-Za-z0-9\-_]+),([A-Za-z0-9\-_]+),([A-Za-z0-9\-_]+),([A-Za-z0-9\-_]+),([A-Za-z0-9\-_]+),([A-Za-z0-9\-_]+)'
-        match = re.match(pattern, message)
-        if match:
-            return AircraftData(*map(str, match.groups()))
-        return None
+        # XAIRCRAFT<simulator_name>,<aircraft_id>,<icao_address>,<aircraft_type>,<registration>,<callsign>,<flight_number>
+        parts = message.split(b',', 7)
+        if len(parts) < 7:
+            return None
+        try:
+            return AircraftData(*[field.decode('utf-8') for field in parts[1:7]])
+        except UnicodeDecodeError:
+            return None
     @staticmethod
-    def _parse_traffic_data(message: str) -> Optional[AirTrafficData]:
+    def _parse_traffic_data(message: bytes) -> Optional[AirTrafficData]:
         """Parse traffic data from the received message."""
-        pattern = r'^XTRAFFIC(?:[^,]+)?,([A-Za-z0-9\-_]+),([-\d.]+),([-\d.]+),([-\d.]+),([-\d.]+),([01]),'\
-                r'([-\d.]+),([-\d.]+),([A-Za-z0-9\-_]+)'
-        match = re.match(pattern, message)
-        if match:
-            groups = match.groups()
+        # XTRAFFIC<simulator_name>,<icao_address>,<latitude>,<longitude>,<altitude_ft>,<vertical_speed_ft/min>,<airborne_flag>,<heading_true>,<velocity_knots>,<callsign>
+        parts = message.split(b',', 10)
+        if len(parts) < 10:
+            return None
+        try:
             return AirTrafficData(
-                icao_address=str(groups[0]),
-                latitude=float(groups[1]),
-                longitude=float(groups[2]),
-                altitude_ft=float(groups[3]),
-                vertical_speed_ft_min=float(groups[4]),
-                airborne_flag=int(groups[5]),
-                heading_true=float(groups[6]),
-                velocity_knots=float(groups[7]),
-                callsign=str(groups[8])
+                icao_address=parts[1].decode('utf-8'),
+                latitude=float(parts[2]),
+                longitude=float(parts[3]),
+                altitude_ft=float(parts[4]),
+                vertical_speed_ft_min=float(parts[5]),
+                airborne_flag=int(parts[6]),
+                heading_true=float(parts[7]),
+                velocity_knots=float(parts[8]),
+                callsign=parts[9].decode('utf-8')
             )
-        return None
+        except ValueError:
+            return None
+
+    def _open_csv_files(self) -> None:
+        """Create the timestamped GPS/attitude/traffic CSV files and write their headers."""
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        self.csv_files = {}
+        for name, header in CSV_HEADERS.items():
+            fh = open(f"output_{name.upper()}_DATA_{timestamp}.csv", "w", newline='', buffering=CSV_BUFFER_SIZE)
+            csv.writer(fh).writerow(header)
+            self.csv_files[name] = fh
 
     def set_csv_logging(self, enabled: bool) -> None:
         """Enable or disable CSV logging."""
         # If we're turning off logging, close any open files
         if self.log_to_csv and not enabled:
+            # Stop the receive thread queueing rows first, so none land after the close marker
+            self.log_to_csv = False
             for file in self.csv_files.values():
                 file.close()
             self.csv_files = {}
+            self._close_recorder()
             
         self.log_to_csv = enabled
         self.armed_for_recording = False
         
         # If we're turning on logging, initialize new CSV files
         if enabled:
-            timestamp = time.strftime("%Y%m%d-%H%M%S")
-            self.csv_files = {
-                'gps': open(f"output_GPS_DATA_{timestamp}.csv", "w", newline=''),
-                'attitude': open(f"output_ATTITUDE_DATA_{timestamp}.csv", "w", newline=''),
-                'traffic': open(f"output_TRAFFIC_DATA_{timestamp}.csv", "w", newline='')
-            }
-            # Write headers
-            csv.writer(self.csv_files['gps']).writerow(['Timestamp', 'Latitude', 'Longitude', 'Altitude', 'Track', 'Ground_Speed'])
-            csv.writer(self.csv_files['attitude']).writerow(['Timestamp', 'True_Heading', 'Pitch', 'Roll'])
-            csv.writer(self.csv_files['traffic']).writerow(['Timestamp', 'ICAO', 'Latitude', 'Longitude', 'Altitude_ft', 'VS_ft_min', 'Airborne', 'Heading', 'Velocity_kts', 'Callsign'])
+            self._open_csv_files()
         
         status = "enabled" if enabled else "disabled"
         print(f"CSV logging {status}")
@@ -243,57 +384,132 @@ class UDPReceiver:
         """Arm the recording system to start when data is received."""
         self.armed_for_recording = True
         self.log_to_csv = False
+        self._close_recorder()
         print("Recording armed and waiting for data")
 
     def get_latest_data(self) -> Dict[str, Any]:
         """Return the latest received GPS and attitude data."""
         # Clean outdated traffic data (older than 30 seconds)
-        current_time = time.time()
-        traffic_timeout = 30.0  # seconds
-        self.traffic_data = {
-            icao: (data, timestamp) 
-            for icao, (data, timestamp) in self.traffic_data.items() 
-            if current_time - timestamp < traffic_timeout
-        }
-        
-        # Only write to CSV if logging is enabled
-        if self.log_to_csv:
-            if self.latest_gps_data:
-                with open("output_recorder/output_GPS_DATA.csv", "a") as f:
-                    writer = csv.writer(f)
-                    writer.writerow([self.latest_gps_data, self.latest_attitude_data, time.time()])
-            
-            #if self.latest_attitude_data:
-            #    with open("output_recorder/output_ATTITUDE_DATA.csv", "a") as f:
-            #        writer = csv.writer(f)
-            #        writer.writerow([self.latest_attitude_data, time.time()])
+        now_ns = time.monotonic_ns()
+        with self._traffic_lock:
+            # Entries are kept in update order, so only the oldest ones need checking
+            while self.traffic_data:
+                icao, (_, timestamp) = next(iter(self.traffic_data.items()))
+                if now_ns - timestamp < TRAFFIC_TIMEOUT_NS:
+                    break
+                del self.traffic_data[icao]
+            traffic = {icao: data for icao, (data, _) in self.traffic_data.items()}
         
         return {
             'gps': self.latest_gps_data,
             'attitude': self.latest_attitude_data,
             'aircraft': self.latest_aircraft_data,
-            'traffic': {icao: data for icao, (data, _) in self.traffic_data.items()},
-            'connected': (time.time() - self.last_receive_time) < RECEIVE_TIMEOUT
+            'traffic': traffic,
+            'connected': (now_ns - self.last_receive_time) < RECEIVE_TIMEOUT_NS
         }
 
+    def _recorder_loop(self) -> None:
+        """Write queued replay recorder rows in batches until a None sentinel arrives."""
+        f = None
+        pending = 0  # rows buffered since the last flush
+        last_flush = time.monotonic()
+        while True:
+            try:
+                batch = [self._recorder_queue.get(timeout=RECORDER_FLUSH_INTERVAL)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < RECORDER_BATCH_SIZE and not self._recorder_queue.empty():
+                batch.append(self._recorder_queue.get())
+            for item in batch:
+                if item is None or item is _RECORDER_CLOSE:
+                    if f:
+                        f.close()
+                        f = None
+                        pending = 0
+                    if item is None:
+                        return
+                    continue
+                if f is None:
+                    try:
+                        f = open(RECORDER_FILE, "a", buffering=CSV_BUFFER_SIZE, newline='')
+                    except OSError as e:
+                        print(f"Error writing {RECORDER_FILE}: {e}")
+                        continue
+                    last_flush = time.monotonic()
+                gps, attitude, timestamp = item
+                if attitude is not None:
+                    f.write(RECORDER_ROW % (gps, attitude, timestamp))
+                else:
+                    f.write(RECORDER_ROW_NO_ATTITUDE % (gps, timestamp))
+                pending += 1
+            if pending and (pending >= RECORDER_FLUSH_ROWS
+                            or time.monotonic() - last_flush >= RECORDER_FLUSH_INTERVAL):
+                f.flush()
+                pending = 0
+                last_flush = time.monotonic()
+
+    def _close_recorder(self) -> None:
+        """Ask the writer thread to close the replay recorder file after the queued rows."""
+        self._recorder_queue.put(_RECORDER_CLOSE)
+
+    def request_stop(self) -> None:
+        """Tell the UDP receiving thread to exit, without waiting for it."""
+        self.running = False
+        if self._wakeup_send:
+            try:
+                self._wakeup_send.send(b'\0')
+            except OSError:
+                pass  # Already woken up and closed
+
     def stop(self) -> None:
         """Stop the UDP receiving thread and close the socket."""
-        self.running = False
+        self.request_stop()
         if self.receive_thread:
             self.receive_thread.join()
+        if self._selector:
+            self._selector.close()
+        if self._wakeup_recv:
+            self._wakeup_recv.close()
+            self._wakeup_send.close()
+            self._wakeup_recv = self._wakeup_send = None
         if self.socket:
             self.socket.close()
         
         # Close any open CSV files
         if self.csv_files:
             for file in self.csv_files.values():
+                file.flush()
                 file.close()
+        # Let the writer thread finish every queued row before returning
+        if self._recorder_thread:
+            self._recorder_queue.put(None)
+            self._recorder_thread.join()
+            self._recorder_thread = None
 
 class AircraftTrackerApp:
     """
     Main application class for the Aircraft Tracker.
     Handles the GUI and updates the aircraft position on the map.
     """
+    # Info display layout, filled in with a single % format per update
+    _INFO_SEPARATOR = "=" * 24 + "\n"
+    _INFO_AIRCRAFT_TEMPLATE = (
+        "Callsign:      %s\n"
+        "Flight:        %s\n"
+    )
+    _INFO_TEMPLATE = (
+        "%s"  # separator, followed by the aircraft lines when available
+        "Latitude:      %8.2f°\n"
+        "Longitude:     %8.2f°\n"
+        "Altitude:      %6.0f ft\n"
+        "Ground Speed:  %5.2f kts\n"
+        "True Heading:  %8.2f°\n"
+        "Pitch:         %8.2f°\n"
+        "Roll:          %8.2f°\n"
+        + _INFO_SEPARATOR +
+        "Traffic Count: %d\n"
+    )
+
     def __init__(self, master: tk.Tk):
         self.master = master
         self.master.title("Aircraft Tracker / Rewinger")
@@ -304,18 +520,42 @@ class AircraftTrackerApp:
         self.flight_plan_path = None
         self.current_kml_file = None
         
+        # Last rendered info display contents and connection state, so
+        # unchanged values don't redraw the Tk widgets
+        self._last_info_key: Optional[tuple] = None
+        self._last_connected: bool = False
+        # Data objects behind the last map/info refresh, see update_aircraft_position
+        self._last_data_signature: Optional[tuple] = None
+        # Set while a <<DataReady>> event or delayed refresh is queued, so
+        # bursts of datagrams cause a single display update
+        self._update_pending: bool = False
+        self._last_refresh: float = 0.0  # time.monotonic() of the last data-driven refresh
+        
         self.setup_ui()
         self.udp_receiver = UDPReceiver()
         self.udp_receiver.start_receiving()
         self.setup_aircraft_marker()
         # Dictionary to keep track of traffic markers
         self.traffic_markers = {}
+        # Last label of each traffic marker as ICAO -> ((callsign, whole feet), text)
+        self._traffic_texts: Dict[str, Tuple[Tuple[str, int], str]] = {}
+        # XAIRCRAFT data behind the own-ship label, and the label itself
+        self._aircraft_text_source: Optional[AircraftData] = None
+        self._aircraft_text: str = ""
         # Setup a different icon for traffic
         self.traffic_image = Image.open("traffic_icon.png").resize((24, 24))
-        self.update_aircraft_position()
+        # One pre-rotated traffic icon per TRAFFIC_HEADING_STEP, indexed by heading bin
+        self._traffic_icons: List[ImageTk.PhotoImage] = [
+            ImageTk.PhotoImage(self.traffic_image.rotate(-angle))
+            for angle in range(0, 360, TRAFFIC_HEADING_STEP)
+        ]
         # Variables to track map center mode
         self.follow_aircraft = True
         self.map_center = None
+        # The display is refreshed when the receiver reports new data
+        self.master.bind("<<DataReady>>", self._on_data_ready)
+        self.udp_receiver.on_data = self._notify_data_ready
+        self._watchdog()
 
     def setup_ui(self):
         """Set up the main user interface components."""
@@ -678,39 +918,55 @@ class AircraftTrackerApp:
         """Set up the aircraft marker image and related variables."""
         self.aircraft_image = Image.open("aircraft_icon.png").resize((32, 32))
         self.rotated_image = ImageTk.PhotoImage(self.aircraft_image)
+        # One pre-rotated own-ship icon per whole degree, indexed by heading
+        self._aircraft_icons: List[ImageTk.PhotoImage] = [
+            ImageTk.PhotoImage(self.aircraft_image.rotate(-angle)) for angle in range(360)
+        ]
         self.aircraft_marker = None
         self.initial_position_set = False
 
     def update_aircraft_position(self):
         """
         Update the aircraft's position on the map and the information display.
-        This method is called periodically to refresh the display.
+        This method is called when new data arrives and by the watchdog.
         """
         data = self.udp_receiver.get_latest_data()
         
+        # The receiver creates new objects for every parsed message, so the same
+        # objects (or equal ones) mean the map and info display are up to date.
+        # Holding the references keeps the comparison safe from id() reuse.
+        signature = (data['gps'], data['attitude'], data['aircraft'], tuple(data['traffic'].values()))
+        
         # Check if we're connected to the simulator
         if data['connected']:
-            self.connection_status.config(text="Connected", fg="green")
+            if not self._last_connected:
+                self.connection_status.config(text="Connected", fg="green")
+                self._last_connected = True
             
-            # Update traffic markers regardless of GPS data
-            if data['traffic']:
-                self.update_traffic_markers(data['traffic'])
-                
-                # If we haven't set an initial position and we have traffic,
-                # use the first traffic position to center the map
-                if not self.initial_position_set and self.follow_aircraft:
-                    first_traffic = next(iter(data['traffic'].values()))
-                    self.map_widget.set_position(first_traffic.latitude, first_traffic.longitude)
-                    self.map_widget.set_zoom(10)
-                    self.initial_position_set = True
-                    self.map_center = (first_traffic.latitude, first_traffic.longitude)
-            # If we have GPS data, update the aircraft marker and info display
-            if data['gps'] and data['attitude']:
-                self.update_aircraft_marker(data)
-                self.update_info_display(data)
+            if signature != self._last_data_signature:
+                self._last_data_signature = signature
+                # Update traffic markers regardless of GPS data
+                if data['traffic']:
+                    self.update_traffic_markers(data['traffic'])
+                    
+                    # If we haven't set an initial position and we have traffic,
+                    # use the first traffic position to center the map
+                    if not self.initial_position_set and self.follow_aircraft:
+                        first_traffic = next(iter(data['traffic'].values()))
+                        self.map_widget.set_position(first_traffic.latitude, first_traffic.longitude)
+                        self.map_widget.set_zoom(10)
+                        self.initial_position_set = True
+                        self.map_center = (first_traffic.latitude, first_traffic.longitude)
+                # If we have GPS data, update the aircraft marker and info display
+                if data['gps'] and data['attitude']:
+                    self.update_aircraft_marker(data)
+                    self.update_info_display(data)
         else:
-            self.connection_status.config(text="Disconnected", fg="red")
+            if self._last_connected:
+                self.connection_status.config(text="Disconnected", fg="red")
+                self._last_connected = False
             self.clear_info_display()
+            self._last_data_signature = None
             
             # Keep traffic markers even when disconnected (just don't add new ones)
             # But clean up aircraft marker
@@ -736,18 +992,56 @@ class AircraftTrackerApp:
                     relief=tk.SUNKEN
                 )
                 self.recording_status.config(text="Status: Recording", fg="#ff3333")
-            
-        self.master.after(UPDATE_INTERVAL, self.update_aircraft_position)
+
+    def _notify_data_ready(self):
+        """Queue a display update. Called from the UDP receive thread."""
+        if self._update_pending:
+            return
+        self._update_pending = True
+        try:
+            self.master.event_generate("<<DataReady>>", when="tail")
+        except (tk.TclError, RuntimeError):
+            # The window is being destroyed
+            self._update_pending = False
+
+    def _on_data_ready(self, event=None):
+        """Handle <<DataReady>> by refreshing the display, at most once per REFRESH_INTERVAL."""
+        delay = self._last_refresh + REFRESH_INTERVAL - time.monotonic()
+        if delay > 0:
+            # Too soon, refresh once the interval is up. _update_pending stays
+            # set, so datagrams arriving meanwhile don't queue more events
+            self.master.after(int(delay * 1000) + 1, self._refresh)
+        else:
+            self._refresh()
+
+    def _refresh(self):
+        """Refresh the display with the latest data and allow the next <<DataReady>>."""
+        self._update_pending = False
+        self._last_refresh = time.monotonic()
+        self.update_aircraft_position()
+
+    def _watchdog(self):
+        """Refresh the display periodically, so disconnects and expired traffic show up without new data."""
+        # Reschedule first, so an error in one refresh doesn't stop the watchdog
+        self.master.after(WATCHDOG_INTERVAL, self._watchdog)
+        self.update_aircraft_position()
 
     def clear_info_display(self):
         """Clear the information display when disconnected."""
-        self.info_display.delete(1.0, tk.END)
-        self.info_display.insert(tk.END, "Waiting for aircraft data...\n")
+        traffic_count = len(self.udp_receiver.traffic_data)
+        key = ("waiting", traffic_count)
+        if key == self._last_info_key:
+            return
+        self._last_info_key = key
+        
+        info_text = "Waiting for aircraft data...\n"
         
         # Display traffic count if available
-        traffic_count = len(self.udp_receiver.traffic_data)
         if traffic_count > 0:
-            self.info_display.insert(tk.END, f"Traffic detected: {traffic_count} aircraft")
+            info_text += f"Traffic detected: {traffic_count} aircraft"
+        
+        # One replace instead of delete + insert, so the widget only reflows once
+        self.info_display.replace(1.0, tk.END, info_text)
 
     def update_traffic_markers(self, traffic_data):
         """Update the traffic markers on the map."""
@@ -756,29 +1050,42 @@ class AircraftTrackerApp:
             if icao not in traffic_data:
                 self.traffic_markers[icao].delete()
                 del self.traffic_markers[icao]
+                self._traffic_texts.pop(icao, None)
         
-        # Update existing markers and add new ones
+        # Update existing markers and add new ones, the icon is picked from
+        # the pre-rotated table by heading bin
+        icons = self._traffic_icons
+        icon_count = len(icons)
         for icao, data in traffic_data.items():
-            rotated_image = self.rotate_traffic_image(data.heading_true)
-            
-            if icao in self.traffic_markers:
-                # Update existing marker
-                self.traffic_markers[icao].delete()
+            rotated_image = icons[round(data.heading_true / TRAFFIC_HEADING_STEP) % icon_count]
             
-            # Create new marker with callsign and altitude
-            altitude_text = f"{int(data.altitude_ft)}'"
-            marker_text = f"{data.callsign} {altitude_text}" if data.callsign else altitude_text
+            # Marker text with callsign and altitude, only reformatted when the
+            # callsign or the displayed altitude changes
+            text_key = (data.callsign, int(data.altitude_ft))
+            cached = self._traffic_texts.get(icao)
+            if cached is not None and cached[0] == text_key:
+                marker_text = cached[1]
+            else:
+                altitude_text = f"{text_key[1]}'"
+                marker_text = f"{data.callsign} {altitude_text}" if data.callsign else altitude_text
+                self._traffic_texts[icao] = (text_key, marker_text)
             
-            self.traffic_markers[icao] = self.map_widget.set_marker(
-                data.latitude, data.longitude,
-                icon=rotated_image,
-                icon_anchor="center",
-                text=marker_text
-            )
-
-    def rotate_traffic_image(self, angle: float) -> ImageTk.PhotoImage:
-        """Rotate the traffic icon image by the given angle."""
-        return ImageTk.PhotoImage(self.traffic_image.rotate(-angle))
+            marker = self.traffic_markers.get(icao)
+            if marker:
+                # Move the existing marker instead of recreating it, each
+                # change_icon/set_text redraws it so skip those when unchanged
+                marker.set_position(data.latitude, data.longitude)
+                if marker.icon is not rotated_image:
+                    marker.change_icon(rotated_image)
+                if marker.text != marker_text:
+                    marker.set_text(marker_text)
+            else:
+                self.traffic_markers[icao] = self.map_widget.set_marker(
+                    data.latitude, data.longitude,
+                    icon=rotated_image,
+                    icon_anchor="center",
+                    text=marker_text
+                )
 
     def update_aircraft_marker(self, data: Dict[str, Any]):
         """Update just the aircraft marker with the latest data."""
@@ -793,24 +1100,28 @@ class AircraftTrackerApp:
             self.map_center = (gps_data.latitude, gps_data.longitude)
         self.rotated_image = self.rotate_image(attitude_data.true_heading)
 
-        # Update or create the aircraft marker
-        if self.aircraft_marker:
-            self.aircraft_marker.delete()
-            
-        # Create marker with appropriate text
+        # Marker text, rebuilt only when a new XAIRCRAFT message was parsed
         if aircraft_data is not None:
-            self.aircraft_marker = self.map_widget.set_marker(
-                gps_data.latitude, gps_data.longitude,
-                icon=self.rotated_image,
-                icon_anchor="center",
-                text=aircraft_data.FlightNumber + " " + aircraft_data.callsign
-            )
+            if aircraft_data is not self._aircraft_text_source:
+                self._aircraft_text_source = aircraft_data
+                self._aircraft_text = aircraft_data.FlightNumber + " " + aircraft_data.callsign
+            marker_text = self._aircraft_text
+        else:
+            marker_text = self.udp_receiver.simulator_name
+            
+        # Update the existing aircraft marker, or create it on first use
+        if self.aircraft_marker:
+            self.aircraft_marker.set_position(gps_data.latitude, gps_data.longitude)
+            if self.aircraft_marker.icon is not self.rotated_image:
+                self.aircraft_marker.change_icon(self.rotated_image)
+            if self.aircraft_marker.text != marker_text:
+                self.aircraft_marker.set_text(marker_text)
         else:
             self.aircraft_marker = self.map_widget.set_marker(
                 gps_data.latitude, gps_data.longitude,
                 icon=self.rotated_image,
                 icon_anchor="center",
-                text=self.udp_receiver.simulator_name
+                text=marker_text
             )
         
         # Center map on aircraft if follow mode is enabled
@@ -829,60 +1140,50 @@ class AircraftTrackerApp:
         alt_ft = gps_data.altitude * 3.28084  # Convert meters to feet
         ground_speed_kts = gps_data.ground_speed * 1.94384  # Convert m/s to knots
 
-        info_text = "=" * 24 + "\n"
+        # Skip the redraw if nothing changes at the displayed precision
+        key = (
+            (aircraft_data.callsign, aircraft_data.FlightNumber) if aircraft_data else None,
+            round(gps_data.latitude, 2), round(gps_data.longitude, 2),
+            round(alt_ft), round(ground_speed_kts, 2),
+            round(attitude_data.true_heading, 2), round(attitude_data.pitch, 2), round(attitude_data.roll, 2),
+            len(data['traffic'])
+        )
+        if key == self._last_info_key:
+            return
+        self._last_info_key = key
+
+        header = self._INFO_SEPARATOR
         
         # Add aircraft data if available
         if aircraft_data:
             callsign = aircraft_data.callsign if aircraft_data.callsign else "N/A"
             flight_num = aircraft_data.FlightNumber if aircraft_data.FlightNumber else "N/A"
-            info_text += f"{'Callsign:':<15}{callsign}\n"
-            info_text += f"{'Flight:':<15}{flight_num}\n"
-        
-        info_text += f"{'Latitude:':<15}{gps_data.latitude:>8.2f}°\n"
-        info_text += f"{'Longitude:':<15}{gps_data.longitude:>8.2f}°\n"
-        info_text += f"{'Altitude:':<15}{alt_ft:>6.0f} ft\n"
-        info_text += f"{'Ground Speed:':<15}{ground_speed_kts:>5.2f} kts\n"
-        info_text += f"{'True Heading:':<15}{attitude_data.true_heading:>8.2f}°\n"
-        info_text += f"{'Pitch:':<15}{attitude_data.pitch:>8.2f}°\n"
-        info_text += f"{'Roll:':<15}{attitude_data.roll:>8.2f}°\n"
+            header += self._INFO_AIRCRAFT_TEMPLATE % (callsign, flight_num)
         
-        # Add traffic count
-        traffic_count = len(data['traffic'])
-        info_text += "=" * 24 + "\n"
-        info_text += f"Traffic Count: {traffic_count}\n"
+        info_text = self._INFO_TEMPLATE % (
+            header,
+            gps_data.latitude, gps_data.longitude, alt_ft, ground_speed_kts,
+            attitude_data.true_heading, attitude_data.pitch, attitude_data.roll,
+            len(data['traffic'])
+        )
 
-        self.info_display.delete(1.0, tk.END)
-        self.info_display.insert(tk.END, info_text)
+        self.info_display.replace(1.0, tk.END, info_text)
 
     def rotate_image(self, angle: float) -> ImageTk.PhotoImage:
         """Rotate the aircraft icon image by the given angle."""
-        return ImageTk.PhotoImage(self.aircraft_image.rotate(-angle))
+        return self._aircraft_icons[int(angle) % 360]
 
     def change_map(self):
         """Change the map tile server based on the user's selection."""
         selected_indices = self.map_listbox.curselection()
         if selected_indices:
-            _, tile_server = self.get_map_options()[selected_indices[0]]
+            _, tile_server = MAP_OPTIONS[selected_indices[0]]
             self.map_widget.set_tile_server(tile_server)
 
     @staticmethod
-    def get_map_options() -> List[Tuple[str, str]]:
-        """Return a list of available map options with their tile server URLs."""
-        return [
-            ("OpenStreetMap", "https://a.tile.openstreetmap.org/{z}/{x}/{y}.png"),
-            ("OpenStreetMap DE", "https://tile.openstreetmap.de/tiles/osmde/{z}/{x}/{y}.png"),
-            ("OpenStreetMap FR", "https://a.tile.openstreetmap.fr/osmfr/{z}/{x}/{y}.png"),
-            ("OpenTopoMap", "https://a.tile.opentopomap.org/{z}/{x}/{y}.png"),
-            ("Google Normal", "https://mt0.google.com/vt/lyrs=m&hl=en&x={x}&y={y}&z={z}"),
-            ("Google Satellite", "https://mt0.google.com/vt/lyrs=s&hl=en&x={x}&y={y}&z={z}"),
-            ("Google Terrain", "https://mt0.google.com/vt/lyrs=p&hl=en&x={x}&y={y}&z={z}"),
-            ("Google Hybrid", "https://mt0.google.com/vt/lyrs=y&hl=en&x={x}&y={y}&z={z}"),
-            ("Carto Dark Matter", "https://cartodb-basemaps-a.global.ssl.fastly.net/dark_all/{z}/{x}/{y}.png"),
-            ("Carto Positron", "https://cartodb-basemaps-a.global.ssl.fastly.net/light_all/{z}/{x}/{y}.png"),
-            ("ESRI World Imagery", "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}"),
-            ("ESRI World Street Map", "https://server.arcgisonline.com/ArcGIS/rest/services/World_Street_Map/MapServer/tile/{z}/{y}/{x}"),
-            ("ESRI World Topo Map", "https://server.arcgisonline.com/ArcGIS/rest/services/World_Topo_Map/MapServer/tile/{z}/{y}/{x}")
-        ]
+    def get_map_options() -> Tuple[Tuple[str, str], ...]:
+        """Return the available map options with their tile server URLs."""
+        return MAP_OPTIONS
 
     def close_application(self):
         """Clean up resources and close the application."""
@@ -892,6 +1193,14 @@ class AircraftTrackerApp:
         if hasattr(self, 'flight_plan_path') and self.flight_plan_path:
             self.flight_plan_path.delete()
             
+        # A notification in flight waits for the Tk main loop, so keep
+        # processing events until the receive thread has exited
+        self.udp_receiver.on_data = None
+        self.udp_receiver.request_stop()
+        receive_thread = self.udp_receiver.receive_thread
+        while receive_thread and receive_thread.is_alive():
+            self.master.update()
+            receive_thread.join(0.05)
         self.udp_receiver.stop()
         self.master.destroy()
 
@@ -6,6 +6,8 @@ import socket
 import sys
 from read_my_csv import extract_gps_from_csv
 
+PROGRESS_INTERVAL = 256  # print a progress line every N data points
+
 class GPSData:
     """Dataclass to store GPS data received from the flight simulator."""
     longitude: float
@@ -53,36 +55,61 @@ def send_data(csv_filename, mode="traffic"):
         gps_att_time_data, icao_address, callsign = extract_gps_from_csv(csv_filename)
         
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) # UDP
+        # Fix the destination once, so each packet is a plain send()
+        sock.connect((UDP_IP, UDP_PORT))
+        sock.setblocking(False)
+        is_traffic = mode.lower() == "traffic"
+        
+        #gps_att_time_data:
+        # 0- longitude,
+        # 1- latitude
+        # 2- altitude,
+        # 3- track,
+        # 4- ground_speed,
+        # 5- true_heading,
+        # 6- pitch,
+        # 7- roll,
+        # 8- time_delta])
+        # Build every datagram up front so the pacing loop only sleeps and sends.
+        # Constant parts are encoded once, rows are %-formatted straight into bytes
+        # (%r keeps the full float repr the f-strings used to produce)
+        if is_traffic:
+            traffic_prefix = f"XTRAFFIC{simulator_name},{icao_address},".encode()
+            traffic_suffix = f",{callsign}".encode()
+            # XTRAFFIC<simulator_name>,<icao_address>,<latitude>,<longitude>,<altitude_ft>,<vertical_speed_ft/min>,<airborne_flag>,<heading_true>,<velocity_knots>,<callsign>
+            packets = [(i[8], (b"%s%r,%r,%r,0.0,%d,%r,%r%s" % (traffic_prefix, i[1], i[0], i[2], airborne_flag, i[5], i[4], traffic_suffix),))
+                       for i in gps_att_time_data]
+        else:  # GPS mode
+            gps_prefix = f"XGPS{simulator_name},".encode()
+            att_prefix = f"XATT{simulator_name},".encode()
+            # XGPS<simulator_name>,<longitude>,<latitude>,<altitude_msl>,<track_true_north>,<groundspeed_m/s>
+            # XATT<simulator_name>,<true_heading>,<pitch>,<roll>
+            packets = [(i[8], (b"%s%r,%r,%r,%r,%r" % (gps_prefix, i[0], i[1], i[2], i[3], i[4]),
+                               b"%s%r,%r,%r" % (att_prefix, i[5], i[6], i[7])))
+                       for i in gps_att_time_data]
+        del gps_att_time_data
         
-        for i in gps_att_time_data:
-            #gps_att_time_data:
-            # 0- longitude,
-            # 1- latitude
-            # 2- altitude,
-            # 3- track,
-            # 4- ground_speed,
-            # 5- true_heading,
-            # 6- pitch,
-            # 7- roll,
-            # 8- time_delta])
+        start = time.perf_counter()
+        elapsed = 0.0 # Recording time of the current row, relative to the first one
+        for time_delta, payloads in packets:
+            # Wait for this row's absolute deadline, so sleep overshoot doesn't accumulate
+            elapsed += time_delta
+            delay = start + elapsed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
             
-            if mode.lower() == "traffic":
-                #print(icao_address)
-                # XTRAFFIC<simulator_name>,<icao_address>,<latitude>,<longitude>,<altitude_ft>,<vertical_speed_ft/min>,<airborne_flag>,<heading_true>,<velocity_knots>,<callsign>
-                message = f"XTRAFFIC{simulator_name},{icao_address},{i[1]},{i[0]},{i[2]},0.0,{airborne_flag},{i[5]},{i[4]},{callsign}"
-                sock.sendto(bytes(message, "utf-8"), (UDP_IP, UDP_PORT))
-            else:  # GPS mode
-                # XGPS<simulator_name>,<longitude>,<latitude>,<altitude_msl>,<track_true_north>,<groundspeed_m/s>
-                message = f"XGPS{simulator_name},{i[0]},{i[1]},{i[2]},{i[3]},{i[4]}"
-                message2 = f"XATT{simulator_name},{i[5]},{i[6]},{i[7]}"
-                sock.sendto(bytes(message, "utf-8"), (UDP_IP, UDP_PORT))
-                sock.sendto(bytes(message2, "utf-8"), (UDP_IP, UDP_PORT))
-            #sock.sendto(bytes(message, "utf-8"), (UDP_IP, UDP_PORT))
+            try:
+                for payload in payloads:
+                    sock.send(payload)
+            except BlockingIOError:
+                pass  # Send buffer full, this data point is dropped
+            except ConnectionRefusedError:
+                pass  # Nothing is listening yet, keep replaying on schedule
             line_count = line_count + 1
-            print(line_count, message, i[8])
-            time.sleep(float(i[8]))
+            if line_count % PROGRESS_INTERVAL == 0:
+                print(f"Sent {line_count}/{len(packets)} data points")
         
-        print(f"Finished sending all data points from {csv_filename}")
+        print(f"Finished sending all {line_count} data points from {csv_filename}")
             
     except FileNotFoundError:
         print(f"Error: File '{csv_filename}' not found")